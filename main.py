@@ -33,7 +33,8 @@ class TaskManagerApp:
         print("5. Отметить задачу как выполненную")
         print("6. Удалить задачу")
         print("7. Найти задачу по ключевому слову")
-        print("8. Выход")
+        print("8. Синхронизировать с другим хранилищем")
+        print("9. Выход")
 
     def handle_choice(self, choice: str) -> None:
         """
@@ -61,6 +62,9 @@ class TaskManagerApp:
             self.search_task()
 
         elif choice == "8":
+            self.sync_tasks()
+
+        elif choice == "9":
             print("Выход из программы.")
             self.task_manager.save_tasks()
             sys.exit(0)
@@ -261,6 +265,24 @@ class TaskManagerApp:
 
         input("\n---Нажмите Enter, чтобы вернуться в меню.---")
 
+    def sync_tasks(self) -> None:
+        """
+        Синхронизирует задачи с другим хранилищем (файлом задач или каталогом с tasks.json).
+        """
+        self.clear_console()
+
+        path = get_input("Введите путь к файлу задач или каталогу другого хранилища: ")
+        try:
+            exchanged = self.task_manager.sync(path)
+        except ValueError as error:   # По указанному пути нет хранилища задач
+            print(f"\n{error}")
+        except OSError as error:      # Нет доступа к файлам другого хранилища
+            print(f"\nНе удалось открыть хранилище: {error}")
+        else:
+            print(f"\nСинхронизация завершена. Передано изменений: {exchanged}.")
+
+        input("\n---Нажмите Enter, чтобы вернуться в меню---")
+
     def run(self) -> None:
         """
         Запускает главный цикл приложения.
@@ -0,0 +1,293 @@
+import json
+import os
+import time
+import uuid
+from typing import Any, Dict, List, Set, Tuple
+
+
+def now_ms() -> int:
+    """
+    Возвращает текущее время в миллисекундах — физическую часть гибридных часов журнала.
+    """
+    return time.time_ns() // 1_000_000
+
+
+class ChangeLog:
+    """
+    Журнал изменений задач одной реплики хранилища.
+    Каждое изменение получает номер seq от гибридных логических часов (время в миллисекундах,
+    которое не меньше ранее виденных номеров) и id реплики. Поэтому более позднее изменение
+    побеждает в конфликте, а номера изменений одной реплики строго растут, и для синхронизации
+    достаточно передать изменения новее известных другой стороне.
+    Состояние журнала (победившие значения полей, удалённые задачи, вектор версий и точки синхронизации
+    с другими репликами) сохраняется в контрольной точке, поэтому при загрузке читается только
+    хвост журнала после неё, а при синхронизации — только изменения после прошлой синхронизации.
+    :param filename: Путь к файлу журнала (JSON Lines, первая строка — заголовок с id реплики).
+    """
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+        self.checkpoint_filename = os.path.splitext(filename)[0] + ".checkpoint.json"
+        self.replica = ""
+        self.clock = 0
+        self.header_size = 0                                     # Размер заголовка файла журнала в байтах
+        self.size = 0                                            # Размер записанной части журнала в байтах
+        self.vector: Dict[str, int] = {}                         # id реплики -> последний известный seq
+        self.stamps: Dict[str, Dict[str, Tuple[int, str]]] = {}  # uid задачи -> поле -> (seq, реплика)
+        self.values: Dict[str, Dict[str, Any]] = {}              # uid задачи -> поле -> победившее значение
+        self.deleted: Set[str] = set()
+        self.sync_points: Dict[str, List[int]] = {}              # id реплики -> [размер журнала, размер её журнала]
+        self.pending: List[dict] = []                            # Применённые, но ещё не записанные в файл
+        self.load()
+
+    def load(self) -> None:
+        """
+        Загружает журнал: состояние из контрольной точки и изменения, записанные после неё.
+        Если контрольной точки нет или она не подходит к журналу, журнал читается целиком.
+        Повреждённые строки изменений пропускаются, а недописанный конец файла (например, после сбоя
+        во время записи) обрезается до последнего корректного изменения.
+        Новая реплика создаётся, только если файла нет или у него нет заголовка;
+        файл без заголовка при этом сохраняется с суффиксом ".bak".
+        """
+        try:
+            f = open(self.filename, "rb")
+        except FileNotFoundError:
+            self._start_replica()
+            return
+
+        with f:
+            header_line = f.readline()
+            header = self._parse_line(header_line)
+            valid_header = isinstance(header, dict) and isinstance(header.get("replica"), str)
+            if valid_header:
+                self.replica = header["replica"]
+                self.header_size = len(header_line)
+                file_size = os.fstat(f.fileno()).st_size
+
+                start = self._load_checkpoint(file_size)
+                f.seek(start)
+                size = valid_size = start
+                replayed = 0
+                for line in f:
+                    size += len(line)
+                    change = self._parse_line(line)
+                    if self._is_change(change):
+                        if self._is_new(change):
+                            self._apply(change)
+                            replayed += 1
+                        valid_size = size
+                    elif not line.strip():
+                        valid_size = size
+
+        if not valid_header:
+            os.replace(self.filename, self.filename + ".bak")
+            self._start_replica()
+            return
+
+        self.size = valid_size
+        if valid_size < file_size or not header_line.endswith(b"\n"):
+            with open(self.filename, "r+b") as f:
+                f.truncate(valid_size)    # Отбрасываем недописанные строки в конце файла
+                f.seek(valid_size - 1)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")       # Следующее изменение должно начаться с новой строки
+                    self.size += 1
+        if replayed:
+            self._save_checkpoint()      # Следующая загрузка не будет повторно читать эти изменения
+
+    def _load_checkpoint(self, file_size: int) -> int:
+        """
+        Загружает состояние из контрольной точки и возвращает позицию в журнале, с которой нужно читать дальше.
+        Если контрольная точка отсутствует, повреждена или относится к другому журналу, возвращает начало журнала.
+        """
+        try:
+            with open(self.checkpoint_filename, "r", encoding="utf-8") as f:
+                checkpoint = json.load(f)
+            if checkpoint["replica"] != self.replica or not self.header_size <= checkpoint["offset"] <= file_size:
+                return self.header_size
+            self.clock = int(checkpoint["clock"])
+            self.vector = {replica: int(seq) for replica, seq in checkpoint["vector"].items()}
+            self.stamps = {uid: {field: (int(stamp[0]), str(stamp[1])) for field, stamp in fields.items()}
+                           for uid, fields in checkpoint["stamps"].items()}
+            self.values = {uid: dict(fields) for uid, fields in checkpoint["values"].items()}
+            self.deleted = set(checkpoint["deleted"])
+            self.sync_points = {replica: [int(point[0]), int(point[1])]
+                                for replica, point in checkpoint["sync_points"].items()}
+            return checkpoint["offset"]
+        except (OSError, ValueError, KeyError, TypeError, AttributeError, IndexError):
+            self.clock, self.vector, self.stamps, self.values = 0, {}, {}, {}
+            self.deleted, self.sync_points = set(), {}
+            return self.header_size
+
+    def _save_checkpoint(self) -> None:
+        """
+        Сохраняет состояние журнала в контрольную точку. Файл заменяется целиком.
+        """
+        checkpoint = {
+            "replica": self.replica,
+            "offset": self.size,
+            "clock": self.clock,
+            "vector": self.vector,
+            "stamps": self.stamps,
+            "values": self.values,
+            "deleted": sorted(self.deleted),
+            "sync_points": self.sync_points,
+        }
+        temp_filename = self.checkpoint_filename + ".tmp"
+        with open(temp_filename, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f, ensure_ascii=False)
+        os.replace(temp_filename, self.checkpoint_filename)
+
+    def _start_replica(self) -> None:
+        """
+        Создаёт файл журнала новой реплики с пустой историей.
+        """
+        self.replica = uuid.uuid4().hex
+        self.clock = 0
+        self.vector, self.stamps, self.values, self.deleted, self.sync_points = {}, {}, {}, set(), {}
+        header = json.dumps({"replica": self.replica}) + "\n"
+        with open(self.filename, "w", encoding="utf-8") as f:
+            f.write(header)
+        self.header_size = self.size = len(header.encode("utf-8"))
+        self._save_checkpoint()
+
+    @staticmethod
+    def _parse_line(line: bytes) -> Any:
+        """
+        Разбирает строку журнала. Возвращает None, если строка не является корректным JSON.
+        """
+        try:
+            return json.loads(line.decode("utf-8"))
+        except ValueError:   # Включает ошибки JSON и кодировки
+            return None
+
+    @staticmethod
+    def _is_change(change: Any) -> bool:
+        """
+        Проверяет, что разобранная строка журнала является записью изменения.
+        """
+        return (isinstance(change, dict)
+                and isinstance(change.get("replica"), str)
+                and isinstance(change.get("seq"), int)
+                and isinstance(change.get("uid"), str)
+                and change.get("op") in ("create", "baseline", "update", "delete")
+                and isinstance(change.get("fields"), dict))
+
+    def _is_new(self, change: dict) -> bool:
+        """
+        Проверяет, что изменения ещё нет в журнале.
+        """
+        return self.vector.get(change["replica"], 0) < change["seq"]
+
+    def version_vector(self) -> Dict[str, int]:
+        """
+        Возвращает последний известный seq для каждой реплики.
+        """
+        return dict(self.vector)
+
+    def changes_since(self, peer: str, peer_size: int, vector: Dict[str, int]) -> List[dict]:
+        """
+        Возвращает изменения, которых нет у реплики peer с указанным вектором версий.
+        Журнал читается с точки последней синхронизации с этой репликой, поэтому стоимость
+        пропорциональна числу записанных после неё изменений. Если журнал peer стал короче,
+        чем был при синхронизации (например, восстановлен из резервной копии), журнал читается целиком.
+        """
+        start = self.header_size
+        if peer in self.sync_points and peer_size >= self.sync_points[peer][1]:
+            start = self.sync_points[peer][0]
+
+        result = []
+        with open(self.filename, "rb") as f:
+            f.seek(start)
+            for line in f:
+                change = self._parse_line(line)
+                if self._is_change(change) and change["seq"] > vector.get(change["replica"], 0):
+                    result.append(change)
+        return result
+
+    def mark_synced(self, peer: str, peer_size: int) -> None:
+        """
+        Запоминает точку синхронизации: все записанные изменения журнала теперь известны реплике peer.
+        """
+        if self.sync_points.get(peer) != [self.size, peer_size]:
+            self.sync_points[peer] = [self.size, peer_size]
+            self._save_checkpoint()
+
+    def record(self, uid: str, op: str, fields: Dict[str, Any]) -> dict:
+        """
+        Записывает локальное изменение задачи ("create", "baseline", "update" или "delete").
+        "baseline" — задача, найденная в файле без записи в журнале (например, созданная до его появления).
+        """
+        return self.record_many([(uid, op, fields)])[0]
+
+    def record_many(self, items: List[Tuple[str, str, Dict[str, Any]]]) -> List[dict]:
+        """
+        Записывает несколько локальных изменений (uid, операция, поля) одной записью в файл.
+        """
+        changes = []
+        for uid, op, fields in items:
+            seq = max(now_ms(), self.clock + 1)   # Гибридные часы: время, но не меньше уже виденных номеров
+            change = {"replica": self.replica, "seq": seq, "uid": uid, "op": op, "fields": fields}
+            self.merge([change])
+            changes.append(change)
+        self.commit()
+        return changes
+
+    def merge(self, changes: List[dict]) -> List[Tuple[dict, Dict[str, Any]]]:
+        """
+        Применяет изменения в памяти в порядке (seq, реплика); в файл они попадают при вызове commit().
+        Уже известные изменения пропускаются.
+        Возвращает пары (изменение, поля, которые выиграли по правилу last-writer-wins).
+        """
+        applied = []
+        for change in sorted(changes, key=lambda c: (c["seq"], c["replica"])):
+            if not self._is_new(change):
+                continue  # Изменение уже есть в журнале
+            applied.append((change, self._apply(change)))
+            self.pending.append(change)
+        return applied
+
+    def commit(self) -> None:
+        """
+        Дописывает применённые изменения в файл журнала и обновляет контрольную точку.
+        Вызывается после сохранения файла задач, чтобы журнал не содержал изменений, которых нет в задачах.
+        """
+        if not self.pending:
+            return
+        data = "".join(json.dumps(change, ensure_ascii=False) + "\n" for change in self.pending).encode("utf-8")
+        with open(self.filename, "r+b") as f:
+            f.seek(self.size)
+            f.truncate()      # Убираем остатки прошлой неудачной записи, если они есть
+            f.write(data)
+        self.size += len(data)
+        self.pending = []
+        self._save_checkpoint()
+
+    def _apply(self, change: dict) -> Dict[str, Any]:
+        """
+        Применяет изменение к состоянию журнала в памяти и возвращает поля, значения которых оно устанавливает.
+        Удаление окончательно: после него изменения задачи не применяются.
+        """
+        self.vector[change["replica"]] = change["seq"]
+        self.clock = max(self.clock, change["seq"])
+
+        uid = change["uid"]
+        if change["op"] == "delete":
+            self.deleted.add(uid)
+            self.stamps.pop(uid, None)
+            self.values.pop(uid, None)
+            return {}
+        if uid in self.deleted:
+            return {}
+
+        # При равных seq побеждает реплика с большим id. Поля задачи, попавшей в журнал через "baseline",
+        # проигрывают любому настоящему изменению, даже если журнал появился на реплике позже
+        stamp = (0 if change["op"] == "baseline" else change["seq"], change["replica"])
+        field_stamps = self.stamps.setdefault(uid, {})
+        field_values = self.values.setdefault(uid, {})
+        winning = {}
+        for field, value in change["fields"].items():
+            if field not in field_stamps or field_stamps[field] < stamp:
+                field_stamps[field] = stamp
+                field_values[field] = value
+                winning[field] = value
+        return winning
@@ -1,3 +1,4 @@
+import uuid
 from typing import Optional
 
 
@@ -11,10 +12,12 @@ class Task:
     :param due_date: Срок выполнения задачи (в формате YYYY-MM-DD).
     :param priority: Приоритет задачи.
     :param status: Статус задачи (по умолчанию новая задача создаётся со статусом "Не выполнена").
+    :param uid: Глобальный идентификатор задачи для синхронизации хранилищ (по умолчанию генерируется автоматически).
     """
     def __init__(self, title: str, description: str, category: str, due_date: str, priority: str,
-                 status: str = "Не выполнена", id: Optional[int] = None) -> None:
+                 status: str = "Не выполнена", id: Optional[int] = None, uid: Optional[str] = None) -> None:
         self.id = id or Task.get_task_id()
+        self.uid = uid or uuid.uuid4().hex
         self.title = title
         self.description = description
         self.category = category
@@ -1,8 +1,13 @@
+import hashlib
 import json
-from typing import List, Optional
+import os
+from typing import Any, Dict, List, Optional, Union
 
+from .change_log import ChangeLog
 from .task import Task
 
+SYNC_FIELDS = ("title", "description", "category", "due_date", "priority", "status")
+
 
 class TaskManager:
     """
@@ -11,25 +16,37 @@ class TaskManager:
     def __init__(self, filename: str = "tasks.json") -> None:
         self.filename = filename
         self.tasks = []
-        self.load_tasks()
+        self.change_log = ChangeLog(self._change_log_filename(filename))
+        self._reconcile_with_log(self.load_tasks())
 
-    def load_tasks(self) -> None:
+    def load_tasks(self) -> bool:
         """
         Загружает задачи из JSON-файла для последующей загрузки в приложение.
+        Возвращает True, если файл задач прочитан.
         """
         try:
             with open(self.filename, "r", encoding="utf-8") as f:
                 tasks_data = json.load(f)
+                legacy_uids = set()
+                for task in tasks_data:
+                    if "uid" not in task:
+                        task["uid"] = self._legacy_uid(task, legacy_uids)
+                        legacy_uids.add(task["uid"])
                 self.tasks = [Task(**task) for task in tasks_data]
+            return True
         except (FileNotFoundError, json.JSONDecodeError):
             self.tasks = []  # Если файл не существует или не может быть прочитан, инициализируем пустой список
+            return False
 
     def save_tasks(self) -> None:
         """
         Сохраняет задачи в JSON-файл для последующей загрузки в приложение.
+        Файл заменяется целиком, поэтому при сбое записи остаётся его прежняя версия.
         """
-        with open(self.filename, "w", encoding="utf-8") as f:
+        temp_filename = self.filename + ".tmp"
+        with open(temp_filename, "w", encoding="utf-8") as f:
             json.dump([task.__dict__ for task in self.tasks], f, ensure_ascii=False, indent=4)
+        os.replace(temp_filename, self.filename)
 
     def view_all_tasks(self) -> List[str]:
         """
@@ -45,6 +62,7 @@ class TaskManager:
         new_task = Task(title, description, category, due_date, priority, id=new_task_id)  # Передаем новый id
         self.tasks.append(new_task)
         self.save_tasks()
+        self.change_log.record(new_task.uid, "create", self._task_fields(new_task))
 
     def view_tasks_by_category(self, category: str) -> List[str]:
         """
@@ -86,8 +104,10 @@ class TaskManager:
                 break  # Прерываем цикл, если нашли нужную задачу
 
         if task:
-            task.mark_as_completed()
-            self.save_tasks()
+            if task.status != "Выполнена":   # Повторная отметка не попадает в журнал изменений
+                task.mark_as_completed()
+                self.save_tasks()
+                self.change_log.record(task.uid, "update", {"status": task.status})
             return True  # Задача найдена и статус обновлен
         else:
             return False  # Задача не найдена
@@ -108,6 +128,7 @@ class TaskManager:
             if task_to_remove:
                 self.tasks = [task for task in self.tasks if task.id != int(task_id)]
                 self.save_tasks()
+                self.change_log.record(task_to_remove.uid, "delete", {})
                 return True   # Задача найдена по id и удалена
             else:
                 return False  # Задача с таким id не найдена
@@ -118,6 +139,7 @@ class TaskManager:
             if tasks_to_remove:
                 self.tasks = [task for task in self.tasks if task.category.lower() != category.lower()]
                 self.save_tasks()
+                self.change_log.record_many([(task.uid, "delete", {}) for task in tasks_to_remove])
                 return True   # Задачи с указанной категорией удалены
             else:
                 return False  # Задачи с такой категорией не найдены
@@ -138,17 +160,180 @@ class TaskManager:
                 break  # Прерываем цикл, если нашли нужную задачу
 
         if task:
-            if title:
-                task.title = title
-            if description:
-                task.description = description
-            if category:
-                task.category = category
-            if due_date:
-                task.due_date = due_date
-            if priority:
-                task.priority = priority
+            changed = {}   # В журнал попадают только поля, значение которых действительно изменилось
+            if title and title != task.title:
+                changed["title"] = title
+            if description and description != task.description:
+                changed["description"] = description
+            if category and category != task.category:
+                changed["category"] = category
+            if due_date and due_date != task.due_date:
+                changed["due_date"] = due_date
+            if priority and priority != task.priority:
+                changed["priority"] = priority
+            for field, value in changed.items():
+                setattr(task, field, value)
             self.save_tasks()
+            if changed:
+                self.change_log.record(task.uid, "update", changed)
             return True  # Задача отредактирована успешно
         else:
             return False  # Задача с таким id не найдена
+
+    def sync(self, other: Union["TaskManager", str]) -> int:
+        """
+        Синхронизирует задачи с другим хранилищем, передавая только изменения после последней синхронизации.
+        other — другой TaskManager, путь к JSON-файлу задач или каталог с файлом tasks.json.
+        Конфликт по одному полю задачи решается по правилу last-writer-wins (при равенстве — по id реплики).
+        Возвращает количество переданных изменений.
+        Журналы читаются только с точки прошлой синхронизации этих реплик (см. ChangeLog).
+        Вызывает ValueError, если по указанному пути нет хранилища задач
+        или у хранилищ один id реплики (например, одно скопировано из другого вместе с журналом).
+        """
+        if isinstance(other, str):
+            if os.path.isdir(other):
+                other = os.path.join(other, "tasks.json")
+            self._check_task_store(other)   # Не даём перезаписать посторонний файл
+            other = TaskManager(filename=other)
+
+        if other.change_log.replica == self.change_log.replica:
+            # Номера изменений копий пересекаются, и изменения друг друга выглядели бы уже известными
+            raise ValueError(f"Хранилище '{other.filename}' — копия этого хранилища с тем же журналом изменений. "
+                             f"Удалите в копии файл '{other.change_log.filename}', чтобы она получила свой id.")
+
+        log, other_log = self.change_log, other.change_log
+        to_other = log.changes_since(other_log.replica, other_log.size, other_log.version_vector())
+        to_self = other_log.changes_since(log.replica, log.size, log.version_vector())
+        self._apply_changes(to_self)
+        other._apply_changes(to_other)
+        log.mark_synced(other_log.replica, other_log.size)
+        other_log.mark_synced(log.replica, log.size)
+        return len(to_other) + len(to_self)
+
+    def _apply_changes(self, changes: List[dict]) -> None:
+        """
+        Применяет изменения, полученные от другой реплики, к списку задач.
+        """
+        applied = self.change_log.merge(changes)
+        if not applied:
+            return  # Новых изменений нет, файл задач не перезаписываем
+
+        tasks_by_uid = {task.uid: task for task in self.tasks}
+        used_ids = {task.id for task in self.tasks}
+        removed = set()
+        for change, fields in applied:
+            uid = change["uid"]
+            task = tasks_by_uid.get(uid)
+            if change["op"] == "delete":
+                if task:
+                    removed.add(uid)
+            elif task:
+                for field, value in fields.items():
+                    if field in SYNC_FIELDS:
+                        setattr(task, field, value)
+            elif change["op"] in ("create", "baseline") and uid not in self.change_log.deleted:
+                # id задачи локальный: при совпадении с существующим выдаём следующий свободный
+                task_id = change["fields"]["id"]
+                if task_id in used_ids:
+                    task_id = max(used_ids) + 1
+                used_ids.add(task_id)
+                task_fields = {field: change["fields"][field] for field in SYNC_FIELDS}
+                task = Task(**task_fields, id=task_id, uid=uid)
+                tasks_by_uid[uid] = task
+                self.tasks.append(task)
+
+        if removed:
+            self.tasks = [task for task in self.tasks if task.uid not in removed]
+        self.save_tasks()
+        self.change_log.commit()   # Журнал дописываем только после сохранения задач
+
+    def _reconcile_with_log(self, tasks_loaded: bool) -> None:
+        """
+        Сверяет задачи из файла с журналом изменений.
+        Задачи без записей в журнале (созданные до его появления или если запись в журнал не удалась)
+        записываются как "baseline", отличающиеся поля — как "update". Задачи, которые есть в журнале,
+        но пропали из файла, восстанавливаются, а удалённые по журналу — убираются из файла.
+        Если файл задач повреждён, перед восстановлением он сохраняется с суффиксом ".bak".
+        """
+        log = self.change_log
+        changes = []
+        on_disk = set()
+        for task in self.tasks:
+            on_disk.add(task.uid)
+            known = log.values.get(task.uid)
+            if task.uid in log.deleted:
+                continue
+            if known is None:
+                changes.append((task.uid, "baseline", self._task_fields(task)))
+            else:
+                diff = {field: getattr(task, field) for field in SYNC_FIELDS if known.get(field) != getattr(task, field)}
+                if diff:
+                    changes.append((task.uid, "update", diff))
+
+        missing = [uid for uid in log.values if uid not in on_disk]
+        if missing or any(task.uid in log.deleted for task in self.tasks):
+            if not tasks_loaded and os.path.exists(self.filename):
+                os.replace(self.filename, self.filename + ".bak")
+            self.tasks = [task for task in self.tasks if task.uid not in log.deleted]
+            used_ids = {task.id for task in self.tasks}
+            for uid in missing:
+                values = log.values[uid]
+                task_id = values.get("id")
+                if not isinstance(task_id, int) or task_id in used_ids:
+                    task_id = max(used_ids, default=0) + 1
+                used_ids.add(task_id)
+                self.tasks.append(Task(**{field: values.get(field, "") for field in SYNC_FIELDS}, id=task_id, uid=uid))
+            self.save_tasks()
+        if changes:
+            log.record_many(changes)
+
+    @staticmethod
+    def _change_log_filename(filename: str) -> str:
+        """
+        Возвращает путь к журналу изменений для файла задач.
+        """
+        return filename + ".changes.jsonl"   # Полное имя: у tasks.json и tasks.txt будут разные журналы
+
+    @classmethod
+    def _check_task_store(cls, filename: str) -> None:
+        """
+        Проверяет, что файл является хранилищем задач: списком задач в JSON
+        или, если файла задач ещё нет, что рядом есть журнал изменений.
+        Иначе вызывает ValueError.
+        """
+        if not os.path.exists(filename):
+            if not os.path.exists(cls._change_log_filename(filename)):
+                raise ValueError(f"Хранилище задач '{filename}' не найдено.")
+            return
+
+        try:
+            with open(filename, "r", encoding="utf-8") as f:
+                tasks_data = json.load(f)
+        except (OSError, ValueError):   # ValueError включает ошибки JSON и кодировки
+            raise ValueError(f"Файл '{filename}' не является файлом задач.")
+
+        if not isinstance(tasks_data, list) or not all(
+                isinstance(task, dict) and isinstance(task.get("id"), int) for task in tasks_data):
+            raise ValueError(f"Файл '{filename}' не является файлом задач.")
+
+    @staticmethod
+    def _legacy_uid(task: Dict[str, Any], used_uids: set) -> str:
+        """
+        Строит uid для задачи из файла без uid по её содержимому, а не по локальному id:
+        в разошедшихся копиях одного старого файла под одним id могут храниться разные задачи.
+        Одинаковые задачи в копиях получат один uid и при синхронизации не задвоятся.
+        """
+        content = "\n".join(str(task.get(field, "")) for field in ("title", "description", "category", "due_date"))
+        base_uid = "legacy-" + hashlib.sha1(content.encode("utf-8")).hexdigest()
+        uid, copy_number = base_uid, 1
+        while uid in used_uids:   # Задачи с одинаковым содержимым в одном файле различаем по номеру копии
+            copy_number += 1
+            uid = f"{base_uid}-{copy_number}"
+        return uid
+
+    @staticmethod
+    def _task_fields(task: Task) -> Dict[str, Any]:
+        """
+        Возвращает синхронизируемые поля задачи вместе с её локальным id.
+        """
+        return {"id": task.id, **{field: getattr(task, field) for field in SYNC_FIELDS}}
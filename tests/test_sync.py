@@ -0,0 +1,354 @@
+import json
+import os
+import shutil
+
+import pytest
+
+from models import change_log
+from models.task_manager import TaskManager
+
+
+@pytest.fixture
+def laptop(tmp_path):
+    """
+    Фикстура хранилища задач на ноутбуке.
+    """
+    return TaskManager(filename=str(tmp_path / "laptop.json"))
+
+@pytest.fixture
+def server(tmp_path):
+    """
+    Фикстура хранилища задач на сервере (каталог с файлом tasks.json).
+    """
+    (tmp_path / "server").mkdir()
+    return TaskManager(filename=str(tmp_path / "server" / "tasks.json"))
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Фикстура управляемых часов журнала: время меняется только явно.
+    """
+    now = {"ms": 1_000_000}
+    monkeypatch.setattr(change_log, "now_ms", lambda: now["ms"])
+    return now
+
+def add_sample_task(manager, title="Задача"):
+    """
+    Добавляет тестовую задачу и возвращает её.
+    """
+    manager.add_task(title, "Описание", "Работа", "2024-12-01", "Высокий")
+    return manager.tasks[-1]
+
+def test_sync_new_tasks(laptop, server):
+    """
+    Тест на обмен новыми задачами в обе стороны.
+    """
+    add_sample_task(laptop, "С ноутбука")
+    add_sample_task(server, "С сервера")
+
+    assert laptop.sync(server) == 2
+    assert sorted(task.title for task in laptop.tasks) == ["С ноутбука", "С сервера"]
+    assert sorted(task.title for task in server.tasks) == ["С ноутбука", "С сервера"]
+    assert len({task.id for task in laptop.tasks}) == 2  # Совпавшие id получили новые значения
+
+def test_sync_sends_only_new_changes(laptop, server):
+    """
+    Тест на то, что повторная синхронизация передаёт только изменения после последней.
+    """
+    for i in range(5):
+        add_sample_task(laptop, f"Задача {i}")
+    assert laptop.sync(server) == 5
+    assert laptop.sync(server) == 0  # Изменений нет
+
+    laptop.mark_task_completed(str(laptop.tasks[0].id))
+    assert laptop.sync(server) == 1
+    assert server.tasks[0].status == "Выполнена"
+
+def test_sync_conflict_last_writer_wins(laptop, server, clock):
+    """
+    Тест на разрешение конфликта по одному полю: побеждает более позднее по времени изменение,
+    даже если другая реплика сделала больше изменений.
+    """
+    add_sample_task(laptop)
+    laptop.sync(server)
+
+    for i in range(10):
+        add_sample_task(laptop, f"Задача {i}")
+    laptop.edit_task(str(laptop.tasks[0].id), title="Название с ноутбука")
+    laptop.edit_task(str(laptop.tasks[0].id), description="Описание с ноутбука")
+    clock["ms"] += 1000
+    server.edit_task(str(server.tasks[0].id), priority="Низкий")
+    server.edit_task(str(server.tasks[0].id), title="Название с сервера")  # Более позднее изменение названия
+    laptop.sync(server)
+
+    for manager in (laptop, server):
+        task = manager.tasks[0]
+        assert task.title == "Название с сервера"
+        assert task.priority == "Низкий"
+        assert task.description == "Описание с ноутбука"
+
+def test_sync_conflict_replica_tiebreak(laptop, server, clock):
+    """
+    Тест на разрешение конфликта при одинаковом номере изменения: по id реплики.
+    """
+    add_sample_task(laptop)
+    laptop.sync(server)
+
+    laptop.edit_task(str(laptop.tasks[0].id), title="Название с ноутбука")
+    server.edit_task(str(server.tasks[0].id), title="Название с сервера")
+    laptop.sync(server)
+
+    winner = max(laptop.change_log.replica, server.change_log.replica)
+    expected = "Название с ноутбука" if winner == laptop.change_log.replica else "Название с сервера"
+    assert laptop.tasks[0].title == server.tasks[0].title == expected
+
+def test_sync_remove_task(laptop, server):
+    """
+    Тест на передачу удаления задачи.
+    """
+    add_sample_task(laptop, "Первая")
+    add_sample_task(laptop, "Вторая")
+    laptop.sync(server)
+
+    server.remove_tasks(task_id=str(server.tasks[0].id))
+    laptop.edit_task(str(laptop.tasks[0].id), title="Правка после удаления")
+    laptop.sync(server)
+
+    assert [task.title for task in laptop.tasks] == ["Вторая"]
+    assert [task.title for task in server.tasks] == ["Вторая"]
+
+def test_sync_with_directory_persists_changes(laptop, server, tmp_path):
+    """
+    Тест на синхронизацию с каталогом и сохранение состояния синхронизации в файлах.
+    """
+    add_sample_task(laptop, "С ноутбука")
+    assert laptop.sync(str(tmp_path / "server")) == 1
+
+    reloaded_server = TaskManager(filename=server.filename)
+    assert [task.title for task in reloaded_server.tasks] == ["С ноутбука"]
+
+    reloaded_laptop = TaskManager(filename=laptop.filename)
+    assert reloaded_laptop.change_log.replica == laptop.change_log.replica
+    assert reloaded_laptop.sync(reloaded_server) == 0
+
+def test_sync_drifted_legacy_files(tmp_path):
+    """
+    Тест на синхронизацию двух разошедшихся файлов без uid: разные задачи с одним id не теряются.
+    """
+    def write_legacy_file(path, tasks):
+        path.parent.mkdir()
+        path.write_text(json.dumps([
+            {"id": task_id, "title": title, "description": "Описание", "category": "Работа",
+             "due_date": "2024-12-01", "priority": "Высокий", "status": "Не выполнена"}
+            for task_id, title in tasks
+        ], ensure_ascii=False), encoding="utf-8")
+
+    write_legacy_file(tmp_path / "laptop" / "tasks.json", [(1, "Общая"), (2, "Только на ноутбуке")])
+    write_legacy_file(tmp_path / "server" / "tasks.json", [(1, "Общая"), (2, "Только на сервере")])
+    laptop = TaskManager(filename=str(tmp_path / "laptop" / "tasks.json"))
+    server = TaskManager(filename=str(tmp_path / "server" / "tasks.json"))
+
+    laptop.sync(server)
+
+    expected = ["Общая", "Только на ноутбуке", "Только на сервере"]
+    assert sorted(task.title for task in laptop.tasks) == expected
+    assert sorted(task.title for task in server.tasks) == expected
+
+def test_sync_legacy_baseline_loses_to_real_edits(tmp_path, clock):
+    """
+    Тест на то, что задачи старого файла, впервые попавшие в журнал позже, не перетирают правки другой копии.
+    """
+    tasks = [
+        {"id": i, "title": f"Задача {i}", "description": "Описание", "category": "Работа",
+         "due_date": "2024-12-01", "priority": "Высокий", "status": "Не выполнена"}
+        for i in range(1, 11)
+    ]
+    for name in ("laptop", "server"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "tasks.json").write_text(json.dumps(tasks, ensure_ascii=False), encoding="utf-8")
+
+    laptop = TaskManager(filename=str(tmp_path / "laptop" / "tasks.json"))
+    laptop.edit_task("10", title="Переименованная задача")
+    laptop.mark_task_completed("10")
+    clock["ms"] += 1000
+    server = TaskManager(filename=str(tmp_path / "server" / "tasks.json"))   # Задача 10 — последняя в списке
+
+    laptop.sync(server)
+
+    for manager in (laptop, server):
+        assert len(manager.tasks) == 10
+        task = next(task for task in manager.tasks if task.id == 10)
+        assert task.title == "Переименованная задача"
+        assert task.status == "Выполнена"
+
+def test_truncated_change_log_keeps_history(laptop, server):
+    """
+    Тест на загрузку журнала с недописанной последней строкой: история и id реплики сохраняются.
+    """
+    add_sample_task(laptop, "Первая")
+    add_sample_task(laptop, "Вторая")
+    laptop.sync(server)
+    replica = laptop.change_log.replica
+
+    with open(laptop.change_log.filename, "a", encoding="utf-8") as f:
+        f.write('{"replica": "' + replica + '", "seq": 9')   # Сбой во время записи изменения
+
+    reloaded = TaskManager(filename=laptop.filename)
+    assert reloaded.change_log.replica == replica
+    assert reloaded.change_log.version_vector() == laptop.change_log.version_vector()
+    assert reloaded.sync(server) == 0
+
+    add_sample_task(reloaded, "Третья")
+    assert reloaded.sync(server) == 1
+    assert TaskManager(filename=laptop.filename).change_log.version_vector() == reloaded.change_log.version_vector()
+
+def test_change_log_without_header_is_backed_up(laptop):
+    """
+    Тест на то, что журнал без заголовка не перезаписывается без резервной копии.
+    """
+    with open(laptop.change_log.filename, "w", encoding="utf-8") as f:
+        f.write("не журнал")
+
+    reloaded = TaskManager(filename=laptop.filename)
+    assert reloaded.change_log.replica != laptop.change_log.replica
+    with open(laptop.change_log.filename + ".bak", encoding="utf-8") as f:
+        assert f.read() == "не журнал"
+
+def test_sync_refuses_non_task_file(laptop, tmp_path):
+    """
+    Тест на отказ синхронизироваться с файлом, который не является файлом задач.
+    """
+    add_sample_task(laptop)
+    notes = tmp_path / "notes.txt"
+    notes.write_text("Личные заметки", encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        laptop.sync(str(notes))
+
+    assert notes.read_text(encoding="utf-8") == "Личные заметки"
+    assert not (tmp_path / "notes.txt.changes.jsonl").exists()
+
+def test_sync_refuses_missing_store(laptop, tmp_path):
+    """
+    Тест на отказ синхронизироваться с каталогом, в котором нет хранилища задач.
+    """
+    (tmp_path / "empty").mkdir()
+
+    with pytest.raises(ValueError):
+        laptop.sync(str(tmp_path / "empty"))
+
+    assert not any((tmp_path / "empty").iterdir())
+
+def test_noop_changes_are_not_recorded(laptop, server):
+    """
+    Тест на то, что изменения без нового значения не попадают в журнал и не передаются.
+    """
+    task = add_sample_task(laptop)
+    laptop.mark_task_completed(str(task.id))
+    laptop.sync(server)
+
+    laptop.mark_task_completed(str(task.id))
+    laptop.edit_task(str(task.id), title=task.title, priority=task.priority)
+    assert laptop.sync(server) == 0
+
+def test_stores_with_same_stem_have_separate_logs(tmp_path):
+    """
+    Тест на то, что файлы задач с одинаковым именем, но разным расширением ведут разные журналы.
+    """
+    json_store = TaskManager(filename=str(tmp_path / "tasks.json"))
+    txt_store = TaskManager(filename=str(tmp_path / "tasks.txt"))
+
+    assert json_store.change_log.filename != txt_store.change_log.filename
+    assert json_store.change_log.replica != txt_store.change_log.replica
+
+def test_sync_refuses_copied_store(tmp_path):
+    """
+    Тест на отказ синхронизироваться с копией хранилища, у которой тот же id реплики.
+    """
+    (tmp_path / "laptop").mkdir()
+    laptop = TaskManager(filename=str(tmp_path / "laptop" / "tasks.json"))
+    add_sample_task(laptop, "Общая")
+    shutil.copytree(tmp_path / "laptop", tmp_path / "copy")
+    copy = TaskManager(filename=str(tmp_path / "copy" / "tasks.json"))
+    add_sample_task(laptop, "С ноутбука")
+    add_sample_task(copy, "Из копии")
+
+    with pytest.raises(ValueError):
+        laptop.sync(copy)
+    with pytest.raises(ValueError):
+        laptop.sync(str(tmp_path / "copy"))
+
+def test_failed_save_is_not_recorded(laptop, server, monkeypatch):
+    """
+    Тест на то, что изменение, которое не удалось сохранить в файл задач, не попадает и в журнал.
+    """
+    add_sample_task(laptop, "Сохранённая")
+
+    def failing_save(self):
+        raise OSError("Диск переполнен")
+    monkeypatch.setattr(TaskManager, "save_tasks", failing_save)
+    with pytest.raises(OSError):
+        add_sample_task(laptop, "Потерянная")
+    monkeypatch.undo()
+
+    reloaded = TaskManager(filename=laptop.filename)
+    reloaded.sync(server)
+    assert [task.title for task in reloaded.tasks] == ["Сохранённая"]
+    assert [task.title for task in server.tasks] == ["Сохранённая"]
+
+def test_failed_log_append_is_recovered_on_load(laptop, server, monkeypatch):
+    """
+    Тест на то, что сохранённые в файл задач изменения, не попавшие в журнал, записываются в него при загрузке.
+    """
+    task = add_sample_task(laptop, "Первая")
+    laptop.sync(server)
+
+    def failing_commit(self):
+        raise OSError("Диск переполнен")
+    monkeypatch.setattr(change_log.ChangeLog, "commit", failing_commit)
+    with pytest.raises(OSError):
+        laptop.edit_task(str(task.id), title="Новое название")
+    with pytest.raises(OSError):
+        add_sample_task(laptop, "Вторая")
+    monkeypatch.undo()
+
+    reloaded = TaskManager(filename=laptop.filename)
+    assert reloaded.sync(server) == 2
+    assert sorted(task.title for task in server.tasks) == ["Вторая", "Новое название"]
+
+def test_missing_tasks_file_is_restored_from_log(laptop):
+    """
+    Тест на восстановление задач из журнала, если файл задач пропал.
+    """
+    add_sample_task(laptop, "Первая")
+    add_sample_task(laptop, "Вторая")
+    os.remove(laptop.filename)
+
+    reloaded = TaskManager(filename=laptop.filename)
+    assert [task.title for task in reloaded.tasks] == ["Первая", "Вторая"]
+    assert [task.id for task in reloaded.tasks] == [1, 2]
+
+def test_sync_reads_only_new_changes(laptop, server, tmp_path, monkeypatch):
+    """
+    Тест на то, что загрузка хранилища и синхронизация читают из журналов только новые изменения,
+    а не всю историю.
+    """
+    for i in range(50):
+        add_sample_task(laptop, f"Задача {i}")
+    for task in laptop.tasks:
+        laptop.mark_task_completed(str(task.id))
+    assert laptop.sync(str(tmp_path / "server")) == 100
+
+    parsed_lines = []
+    parse_line = change_log.ChangeLog._parse_line
+    monkeypatch.setattr(change_log.ChangeLog, "_parse_line", staticmethod(
+        lambda line: parsed_lines.append(line) or parse_line(line)))
+
+    reloaded = TaskManager(filename=laptop.filename)
+    assert len(parsed_lines) == 1   # Только заголовок журнала, история берётся из контрольной точки
+
+    reloaded.edit_task(str(reloaded.tasks[0].id), title="Новое название")
+    parsed_lines.clear()
+    assert reloaded.sync(str(tmp_path / "server")) == 1
+    assert len(parsed_lines) == 2   # Заголовок журнала сервера и одно новое изменение
+    assert TaskManager(filename=server.filename).tasks[0].title == "Новое название"
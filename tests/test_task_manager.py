@@ -4,11 +4,11 @@ from models.task_manager import TaskManager
 
 
 @pytest.fixture
-def task_manager():
+def task_manager(tmp_path):
     """
     Фикстура для инициализации TaskManager с тестовым файлом.
     """
-    manager = TaskManager(filename="test_tasks.json")
+    manager = TaskManager(filename=str(tmp_path / "test_tasks.json"))
     manager.tasks = []  # Очищаем задачи перед тестами
     return manager
 